@@ -0,0 +1,198 @@
+# admission_control.py
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+# --- Render budgets ---
+RENDER_MEMORY_BUDGET_BYTES = int(os.getenv("RENDER_MEMORY_BUDGET_BYTES", str(3 * 1024**3)))  # 3 GiB
+# CPU is budgeted in "render slots": one 1920x1080@24fps encode costs 1.0
+RENDER_CPU_BUDGET = float(os.getenv("RENDER_CPU_BUDGET", str(max(1, (os.cpu_count() or 2) // 2))))
+RENDER_MAX_QUEUE = int(os.getenv("RENDER_MAX_QUEUE", "8"))
+# Scrapes hold decoded full-resolution images before their render is costed, so only this many run at once
+RENDER_MAX_SCRAPES = int(os.getenv("RENDER_MAX_SCRAPES", "2"))
+
+# --- Cost model ---
+BYTES_PER_PIXEL = 3  # RGB uint8
+RENDER_BASE_MEMORY_BYTES = 200 * 1024**2  # MoviePy/NumPy working set plus the ffmpeg writer process
+FRAMES_PER_SLIDE = 3  # resized image, text-overlay copy and the NumPy frame kept by each ImageClip
+COMPOSE_FRAME_BUFFERS = 8  # per-frame zoom/fade/compose intermediates while encoding
+REFERENCE_PIXEL_RATE = 1920 * 1080 * 24
+DEFAULT_SECONDS_PER_SLIDE = 10.0
+
+
+class AdmissionRejected(Exception):
+    """Raised when a render cannot be queued; retry_after is a hint in seconds."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RenderCost:
+    """
+    Estimated peak memory, CPU slots and wall time of one render job.
+    source_bytes is the part of memory_bytes held by the decoded source images, which a job keeps even while queued.
+    """
+
+    def __init__(self, memory_bytes, cpu_units, slides, source_bytes):
+        self.memory_bytes = memory_bytes
+        self.cpu_units = cpu_units
+        self.slides = slides
+        self.source_bytes = source_bytes
+
+
+class RenderTicket:
+    """A job's place in the admission queue. granted is set once its budget has been reserved."""
+
+    def __init__(self, cost):
+        self.cost = cost
+        self.granted = asyncio.Event()
+        self.started_at = None
+
+
+def estimate_render_cost(images, video_size, fps=24, cpu_factor=1.0):
+    """
+    Estimates a render's cost from the decoded source images and the output size.
+    Source images stay in memory for the whole job; each slide keeps a few full output frames alive
+    and the compose/encode step holds a fixed number of frame buffers on top.
+    cpu_factor scales the CPU cost for the encoding profile's x264 preset (1.0 for "medium").
+    """
+    frame_bytes = video_size[0] * video_size[1] * BYTES_PER_PIXEL
+    source_bytes = sum(img.width * img.height for img in images) * BYTES_PER_PIXEL
+    memory_bytes = (
+        RENDER_BASE_MEMORY_BYTES
+        + source_bytes
+        + len(images) * FRAMES_PER_SLIDE * frame_bytes
+        + COMPOSE_FRAME_BUFFERS * frame_bytes
+    )
+    cpu_units = video_size[0] * video_size[1] * fps / REFERENCE_PIXEL_RATE * cpu_factor
+    return RenderCost(memory_bytes, cpu_units, len(images), source_bytes)
+
+
+class AdmissionController:
+    """
+    FIFO admission for render jobs against memory and CPU budgets.
+    Jobs that fit run immediately, others wait in a bounded queue, and anything beyond that is rejected.
+    A job larger than the whole budget is still admitted, but only when nothing else is running.
+    Queued jobs already hold their decoded source images, so those bytes count against the memory budget too.
+    Jobs that are still scraping are not costed yet; scrape_slot() bounds how many there are.
+    Only used from the event loop, so no locking is needed.
+    """
+
+    def __init__(self, memory_budget, cpu_budget, max_queue, max_scrapes):
+        self.memory_budget = memory_budget
+        self.cpu_budget = cpu_budget
+        self.max_queue = max_queue
+        self.running = []
+        self.queue = deque()
+        self.seconds_per_slide = DEFAULT_SECONDS_PER_SLIDE
+        self.max_scrapes = max_scrapes
+        self.scraping = 0
+        self._scrape_slots = asyncio.Semaphore(max_scrapes)
+
+    def _memory_reserved(self):
+        return sum(ticket.cost.memory_bytes for ticket in self.running)
+
+    def _memory_queued(self):
+        return sum(ticket.cost.source_bytes for ticket in self.queue)
+
+    def _fits(self, cost, memory_queued):
+        """memory_queued is the source bytes held by queued jobs other than the one being checked."""
+        if not self.running:
+            return True
+        cpu_in_use = sum(ticket.cost.cpu_units for ticket in self.running)
+        return (
+            self._memory_reserved() + memory_queued + cost.memory_bytes <= self.memory_budget
+            and cpu_in_use + cost.cpu_units <= self.cpu_budget
+        )
+
+    def _grant(self, ticket):
+        self.running.append(ticket)
+        ticket.granted.set()
+
+    def _grant_waiting(self):
+        while self.queue and self._fits(self.queue[0].cost, self._memory_queued() - self.queue[0].cost.source_bytes):
+            self._grant(self.queue.popleft())
+
+    def retry_after(self):
+        """Rough seconds until a new job could be queued: the soonest finish plus the queued work ahead."""
+        now = time.monotonic()
+        remaining = [
+            max(0.0, ticket.cost.slides * self.seconds_per_slide - (now - (ticket.started_at or now)))
+            for ticket in self.running
+        ]
+        queued = sum(ticket.cost.slides * self.seconds_per_slide for ticket in self.queue)
+        return max(1, math.ceil(min(remaining, default=0.0) + queued / max(1, len(self.running))))
+
+    @asynccontextmanager
+    async def scrape_slot(self):
+        """Waits for one of max_scrapes slots. Hold it until the job's images are reserved or dropped."""
+        async with self._scrape_slots:
+            self.scraping += 1
+            try:
+                yield
+            finally:
+                self.scraping -= 1
+
+    def check_capacity(self):
+        """Cheap pre-check before any scraping: rejects when the queue is already full."""
+        if len(self.queue) >= self.max_queue:
+            raise AdmissionRejected("Render queue is full.", self.retry_after())
+
+    def reserve(self, cost):
+        """Admits a job. Returns its ticket, which may still be waiting in the queue."""
+        ticket = RenderTicket(cost)
+        memory_queued = self._memory_queued()
+        if not self.queue and self._fits(cost, memory_queued):
+            self._grant(ticket)
+        elif len(self.queue) >= self.max_queue:
+            raise AdmissionRejected("Render capacity exceeded and the queue is full.", self.retry_after())
+        elif self._memory_reserved() + memory_queued + cost.source_bytes > self.memory_budget:
+            raise AdmissionRejected("Not enough render memory to queue this job's images.", self.retry_after())
+        else:
+            self.queue.append(ticket)
+        return ticket
+
+    def position(self, ticket):
+        """0 when the job may run, otherwise its 1-based position in the queue."""
+        if ticket.granted.is_set():
+            return 0
+        return self.queue.index(ticket) + 1
+
+    async def wait_for_turn(self, ticket):
+        await ticket.granted.wait()
+        ticket.started_at = time.monotonic()
+
+    def release(self, ticket):
+        """Frees a job's budget (or drops it from the queue) and starts queued jobs that now fit."""
+        if ticket in self.running:
+            self.running.remove(ticket)
+            if ticket.started_at is not None and ticket.cost.slides:
+                elapsed_per_slide = (time.monotonic() - ticket.started_at) / ticket.cost.slides
+                self.seconds_per_slide = 0.8 * self.seconds_per_slide + 0.2 * elapsed_per_slide
+        elif ticket in self.queue:
+            self.queue.remove(ticket)
+        self._grant_waiting()
+
+    def snapshot(self):
+        return {
+            "running": len(self.running),
+            "queued": len(self.queue),
+            "max_queue": self.max_queue,
+            "scraping": self.scraping,
+            "max_scrapes": self.max_scrapes,
+            "memory_reserved_bytes": self._memory_reserved(),
+            "memory_queued_bytes": self._memory_queued(),
+            "memory_budget_bytes": self.memory_budget,
+            "cpu_reserved": sum(ticket.cost.cpu_units for ticket in self.running),
+            "cpu_budget": self.cpu_budget,
+            "retry_after_seconds": self.retry_after(),
+        }
+
+
+render_admission = AdmissionController(
+    RENDER_MEMORY_BUDGET_BYTES, RENDER_CPU_BUDGET, RENDER_MAX_QUEUE, RENDER_MAX_SCRAPES
+)
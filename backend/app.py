@@ -1,23 +1,95 @@
 import os
+import time
 import uuid
 import asyncio
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends, Request
+from fastapi.responses import FileResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 
-from database import SessionLocal, engine
+from database import SessionLocal
 import models
 import schemas
 
-from scraper import scrape_product_data
-from overlay_generator import generate_overlay_text
-from video_creator import create_ad_video
+# scraper, overlay_generator and video_creator pull in requests, BeautifulSoup, Pillow, NumPy, gTTS and
+# MoviePy. They are imported where they are used so the API process starts without them.
+from render_config import DEFAULT_ENCODING_PROFILE, ENCODING_PROFILES, VIDEO_SIZES
+from admission_control import AdmissionRejected, estimate_render_cost, render_admission
+from throttled_http import SCRAPER_WORKERS, ThrottledError
+from storage_manager import (
+    STORAGE_SWEEP_INTERVAL,
+    TEMP_VIDEO_DIR,
+    get_storage_usage,
+    preview_paths,
+    record_access,
+    remove_video_files,
+    sweep_storage,
+)
+
+# Schema setup is an explicit step (`python migrate.py`), not an import side effect.
+# Set to preload the render modules in a background thread after startup instead of on the first request.
+PRELOAD_RENDER_MODULES = os.getenv("PRELOAD_RENDER_MODULES", "false").lower() == "true"
+
+
+def preload_render_modules():
+    import scraper  # noqa: F401
+    import overlay_generator  # noqa: F401
+    import video_creator  # noqa: F401
+
+
+# Scrapes sleep in per-host token buckets and retry backoff, so they get their own pool instead of tying up
+# the default executor that renders, LLM calls and the storage sweep run on.
+scrape_executor = ThreadPoolExecutor(max_workers=SCRAPER_WORKERS, thread_name_prefix="scraper")
+
+
+# The heavy modules are imported inside these functions, which only ever run in worker threads
+# (asyncio.to_thread or scrape_executor), so a first-time import never stalls the event loop.
+def scrape_in_worker(url):
+    from scraper import scrape_product_data
+
+    return scrape_product_data(url)
+
+
+def generate_overlay_text_in_worker(product_data, num_images):
+    from overlay_generator import generate_overlay_text
+
+    return generate_overlay_text(product_data, num_images)
+
+
+def create_ad_video_in_worker(**kwargs):
+    from video_creator import create_ad_video
+
+    return create_ad_video(**kwargs)
+
+
+async def storage_sweep_loop():
+    """Runs the storage lifecycle sweep periodically in a worker thread."""
+    while True:
+        try:
+            report = await asyncio.to_thread(sweep_storage, SessionLocal)
+            for video_filename in report["evicted"] + report["missing"]:
+                invalidate_video_status(video_filename)
+        except Exception as e:
+            print(f"🚨 Storage sweep failed: {e}")
+        await asyncio.sleep(STORAGE_SWEEP_INTERVAL)
+
 
-models.Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    sweeper = asyncio.create_task(storage_sweep_loop())
+    preloader = asyncio.create_task(asyncio.to_thread(preload_render_modules)) if PRELOAD_RENDER_MODULES else None
+    yield
+    sweeper.cancel()
+    if preloader:
+        preloader.cancel()
+    scrape_executor.shutdown(wait=False, cancel_futures=True)
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
 FRONTEND_ENDPOINT = os.getenv("FRONTEND_ENDPOINT", "http://localhost:3000")
 
 print("FRONTEND_ENDPOINT", FRONTEND_ENDPOINT)
@@ -28,12 +100,22 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After"],
 )
 
-# --- Directory for temporary video storage ---
-TEMP_VIDEO_DIR = "temp_videos"
+# --- Directory for temporary video storage (lifecycle handled by storage_manager) ---
 os.makedirs(TEMP_VIDEO_DIR, exist_ok=True)
 
+# --- HTTP caching for generated media ---
+# Filenames are UUIDs and a completed video is never rewritten, so browsers/CDNs may cache it forever.
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Browsers issue many range requests per video; cache the status lookup instead of hitting the DB each time.
+# "completed" is final and cached until the video is deleted; other statuses are re-checked after the TTL.
+# Unknown filenames are never cached and the cache is a bounded LRU, so arbitrary request paths can't grow it.
+VIDEO_STATUS_CACHE_TTL = float(os.getenv("VIDEO_STATUS_CACHE_TTL", "5"))
+VIDEO_STATUS_CACHE_SIZE = int(os.getenv("VIDEO_STATUS_CACHE_SIZE", "1024"))
+_video_status_cache = OrderedDict()
+
 
 def get_db():
     db = SessionLocal()
@@ -43,6 +125,58 @@ def get_db():
         db.close()
 
 
+def get_video_status(video_filename: str, db: Session):
+    """Returns the DB status for a video filename (None if unknown), using a small in-process cache."""
+    now = time.monotonic()
+    cached = _video_status_cache.get(video_filename)
+    if cached and (cached[0] == "completed" or cached[1] > now):
+        _video_status_cache.move_to_end(video_filename)
+        return cached[0]
+
+    video_entry = db.query(models.Video).filter(models.Video.video_filename == video_filename).first()
+    if not video_entry:
+        _video_status_cache.pop(video_filename, None)
+        return None
+
+    _video_status_cache[video_filename] = (video_entry.status, now + VIDEO_STATUS_CACHE_TTL)
+    _video_status_cache.move_to_end(video_filename)
+    while len(_video_status_cache) > VIDEO_STATUS_CACHE_SIZE:
+        _video_status_cache.popitem(last=False)
+    return video_entry.status
+
+
+def invalidate_video_status(video_filename: str):
+    _video_status_cache.pop(video_filename, None)
+
+
+def cached_file_response(request: Request, file_path: str, media_type: str, filename=None, immutable=False):
+    """
+    FileResponse with ETag/Last-Modified validators and Cache-Control.
+    Answers conditional requests (If-None-Match / If-Modified-Since) with 304 without touching the file body.
+    """
+    stat_result = os.stat(file_path)
+    response = FileResponse(path=file_path, media_type=media_type, filename=filename, stat_result=stat_result)
+    response.headers["cache-control"] = IMMUTABLE_CACHE_CONTROL if immutable else "no-cache"
+
+    etag = response.headers["etag"]
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        not_modified = if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]
+    else:
+        not_modified = request.headers.get("if-modified-since") == response.headers["last-modified"]
+
+    if not_modified:
+        return Response(
+            status_code=304,
+            headers={
+                "etag": etag,
+                "last-modified": response.headers["last-modified"],
+                "cache-control": response.headers["cache-control"],
+            },
+        )
+    return response
+
+
 # --- Health Check Endpoint ---
 @app.get("/")
 async def read_root():
@@ -64,30 +198,63 @@ async def generate_ad_video_endpoint(
 
     video_filepath = None  # Initialize to None for error handling
     new_video_db_entry = None  # Initialize db entry for update
+    render_ticket = None  # Admission reservation, released here unless handed to the background task
 
     try:
-        print(f"🔍 Scraping product data for URL: {url}")
-        try:
-            product_data, image_bytes_list = scrape_product_data(url)
-        except Exception:
-            raise HTTPException(status_code=400, detail="Failed to scrape product data or images.")
-
-        if not product_data or not image_bytes_list:
-            raise HTTPException(status_code=500, detail="Failed to scrape product data or images.")
+        # Reject early, before scraping, when the render queue is already full
+        render_admission.check_capacity()
+
+        # Scraping decodes full-resolution images before the render can be costed; a scrape slot is held until
+        # the job's images are reserved, so a burst of requests can't decode them all at once
+        async with render_admission.scrape_slot():
+            print(f"🔍 Scraping product data for URL: {url}")
+            try:
+                # On the scraper pool: per-host rate limiting and retry backoff sleep
+                product_data, image_bytes_list = await asyncio.get_running_loop().run_in_executor(
+                    scrape_executor, scrape_in_worker, url
+                )
+            except ThrottledError as e:
+                print(f"⛔ Scraping throttled: {e}")
+                raise HTTPException(
+                    status_code=503,
+                    detail=f"The product site is throttling requests: {e}",
+                    headers={"Retry-After": str(e.retry_after)},
+                )
+            except Exception as e:
+                print(f"🚨 Scraping failed: {e}")
+                raise HTTPException(status_code=400, detail="Failed to scrape product data or images.")
+
+            if not product_data or not image_bytes_list:
+                raise HTTPException(status_code=500, detail="Failed to scrape product data or images.")
+
+            # Reserve memory/CPU budget for the render; the job may have to wait in the queue
+            encoding_profile = input_data.encoding_profile
+            profile = ENCODING_PROFILES[encoding_profile]
+            render_cost = estimate_render_cost(
+                image_bytes_list, VIDEO_SIZES["16:9"], fps=profile["fps"], cpu_factor=profile["cpu_factor"]
+            )
+            render_ticket = render_admission.reserve(render_cost)
+            print(
+                f"🧮 Estimated render cost: {render_cost.memory_bytes / 1024**2:.0f} MiB, "
+                f"{render_cost.cpu_units:.2f} CPU, queue position {render_admission.position(render_ticket)}"
+            )
 
-        # Create initial DB entry with "processing" status
+        # Create initial DB entry with "queued" or "processing" status
         new_video_db_entry = models.Video(
             original_url=url,
             product_title=product_data.get("title", "Untitled Product"),
             video_filename="",  # Will be updated after UUID is generated
-            status="processing",
+            status="queued" if render_admission.position(render_ticket) else "processing",
+            encoding_profile=encoding_profile,
         )
         db.add(new_video_db_entry)
         db.commit()
         db.refresh(new_video_db_entry)
 
         print("🤖 Generating overlay text from LM Studio...")
-        overlay_bullets = generate_overlay_text(product_data, len(image_bytes_list))
+        overlay_bullets = await asyncio.to_thread(
+            generate_overlay_text_in_worker, product_data, len(image_bytes_list)
+        )
 
         if not overlay_bullets:
             raise HTTPException(status_code=500, detail="Failed to generate ad copy.")
@@ -118,16 +285,30 @@ async def generate_ad_video_endpoint(
             create_video_and_update_db,
             db_session_factory=SessionLocal,
             video_id=new_video_db_entry.id,
+            render_ticket=render_ticket,
             image_bytes_list=image_bytes_list,
             overlay_bullets=overlay_bullets,
             title=product_data["title"],
             price=product_data["price"],
             output_filepath=video_filepath,
+            encoding_profile=encoding_profile,
         )
 
-        return new_video_db_entry
+        response = schemas.Video.model_validate(new_video_db_entry)
+        response.queue_position = render_admission.position(render_ticket)
+        render_ticket = None
+        return response
 
+    except AdmissionRejected as e:
+        print(f"⏳ Rejecting video generation request: {e}")
+        raise HTTPException(
+            status_code=429,
+            detail=f"{e} Please retry later.",
+            headers={"Retry-After": str(e.retry_after)},
+        )
     except HTTPException as e:
+        if render_ticket:
+            render_admission.release(render_ticket)
         # If an HTTPException occurs, update DB status to "failed" if entry exists
         if new_video_db_entry:
             new_video_db_entry.status = "failed"
@@ -136,6 +317,8 @@ async def generate_ad_video_endpoint(
         raise e
     except Exception as e:
         print(f"🚨 An unexpected error occurred during video generation request: {e}")
+        if render_ticket:
+            render_admission.release(render_ticket)
         # Clean up any partial video file if an error occurred during its creation
         if video_filepath and os.path.exists(video_filepath):
             os.remove(video_filepath)
@@ -148,13 +331,23 @@ async def generate_ad_video_endpoint(
 
 
 async def create_video_and_update_db(
-    db_session_factory, video_id: int, image_bytes_list, overlay_bullets, title, price, output_filepath
+    db_session_factory,
+    video_id: int,
+    render_ticket,
+    image_bytes_list,
+    overlay_bullets,
+    title,
+    price,
+    output_filepath,
+    encoding_profile,
 ):
     """
     Background task to create the video and update its status in the database.
     Receives a db_session_factory to create its own session, as DB sessions are not thread-safe.
+    Waits for its admission ticket, then renders in a worker thread so the event loop stays responsive.
     """
     db = db_session_factory()
+    video_entry = None
     try:
 
         video_entry = db.query(models.Video).filter(models.Video.id == video_id).first()
@@ -162,20 +355,29 @@ async def create_video_and_update_db(
             print(f"Error: Video entry with ID {video_id} not found in DB for background task.")
             return
 
+        await render_admission.wait_for_turn(render_ticket)
+        if video_entry.status != "processing":
+            video_entry.status = "processing"
+            db.add(video_entry)
+            db.commit()
+
         print(f"Starting background video creation for ID: {video_id} - {output_filepath}")
         # Call the actual video creation function
-        create_ad_video(
+        await asyncio.to_thread(
+            create_ad_video_in_worker,
             image_list=image_bytes_list,
             bullets=overlay_bullets,
             title=title,
             price=price,
             output=output_filepath,
+            encoding_profile=encoding_profile,
             # aspect_ratio="9:16",
         )
         print(f"Video creation completed for ID: {video_id}")
         video_entry.status = "completed"
         db.add(video_entry)
         db.commit()
+        invalidate_video_status(video_entry.video_filename)
     except Exception as e:
         print(f"🚨 Error in background video creation for ID {video_id}: {e}")
 
@@ -183,37 +385,24 @@ async def create_video_and_update_db(
             video_entry.status = "failed"
             db.add(video_entry)
             db.commit()
+            invalidate_video_status(video_entry.video_filename)
 
-        if os.path.exists(output_filepath):
-            os.remove(output_filepath)
+        remove_video_files(os.path.basename(output_filepath))
     finally:
+        render_admission.release(render_ticket)
         db.close()
 
 
-async def delete_file_after_delay(filepath: str):
-    """Deletes a file after a short delay."""
-    await asyncio.sleep(600)  # Wait 10 minutes (600 seconds) to ensure file is streamed and user downloads it
-    if os.path.exists(filepath):
-        try:
-            os.remove(filepath)
-            print(f"Cleaned up temporary file: {filepath}")
-        except Exception as e:
-            print(f"Error cleaning up file {filepath}: {e}")
-
-
 @app.get("/get-video/{video_filename}")
-async def get_video_file(video_filename: str, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+async def get_video_file(video_filename: str, request: Request, db: Session = Depends(get_db)):
     """
     Serves the generated video file.
-    Includes a background task to delete the file after it's sent.
+    Completed videos are fast-start MP4s served with immutable cache headers; FileResponse handles Range requests.
     """
     file_path = os.path.join(TEMP_VIDEO_DIR, video_filename)
 
-    video_entry = db.query(models.Video).filter(models.Video.video_filename == video_filename).first()
-    if not video_entry or video_entry.status not in [
-        "completed",
-        "processing",
-    ]:  # Allow fetching processing if needed
+    status = get_video_status(video_filename, db)
+    if status not in ["completed", "processing"]:  # Allow fetching processing if needed
         raise HTTPException(status_code=404, detail="Video not found or is in an invalid state.")
 
     if not os.path.exists(file_path):
@@ -221,16 +410,53 @@ async def get_video_file(video_filename: str, background_tasks: BackgroundTasks,
             status_code=404, detail="Video file not found on server disk. It might have been cleaned up."
         )
 
-    # FileResponse handles streaming (Content-Range) automatically for browsers
-    response = FileResponse(
-        path=file_path,
+    record_access(video_filename)
+    return cached_file_response(
+        request,
+        file_path,
         media_type="video/mp4",
         filename=video_filename,
+        immutable=status == "completed",
     )
 
-    # background_tasks.add_task(delete_file_after_delay, file_path)
 
-    return response
+async def get_preview_image(video_filename: str, index: int, request: Request, db: Session):
+    if get_video_status(video_filename, db) != "completed":
+        raise HTTPException(status_code=404, detail="Video not found or is not completed yet.")
+
+    image_path = preview_paths(os.path.join(TEMP_VIDEO_DIR, video_filename))[index]
+    if not os.path.exists(image_path):
+        raise HTTPException(status_code=404, detail="Preview image not found on server disk.")
+
+    return cached_file_response(request, image_path, media_type="image/jpeg", immutable=True)
+
+
+@app.get("/get-poster/{video_filename}")
+async def get_video_poster(video_filename: str, request: Request, db: Session = Depends(get_db)):
+    """Serves the poster image (first slide) generated at render time."""
+    return await get_preview_image(video_filename, 0, request, db)
+
+
+@app.get("/get-thumbnails/{video_filename}")
+async def get_video_thumbnails(video_filename: str, request: Request, db: Session = Depends(get_db)):
+    """Serves the thumbnail strip (one tile per slide) generated at render time."""
+    return await get_preview_image(video_filename, 1, request, db)
+
+
+@app.get("/encoding-profiles/")
+async def list_encoding_profiles():
+    """
+    Returns the available encoding profiles and the default used when a request doesn't pick one.
+    """
+    return {"default": DEFAULT_ENCODING_PROFILE, "profiles": ENCODING_PROFILES}
+
+
+@app.get("/queue/", response_model=schemas.RenderQueueStatus)
+async def render_queue_status():
+    """
+    Reports render admission state: running and queued jobs against the memory/CPU budgets.
+    """
+    return render_admission.snapshot()
 
 
 @app.get("/videos/", response_model=list[schemas.VideoList])  # Response model is a list of VideoList schemas
@@ -253,21 +479,34 @@ async def delete_video(video_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Video not found.")
 
     video_filename = video_entry.video_filename
-    file_path = os.path.join(TEMP_VIDEO_DIR, video_filename)
 
     # Delete from database
     db.delete(video_entry)
     db.commit()
+    invalidate_video_status(video_filename)
 
-    # Delete file from disk
-    if os.path.exists(file_path):
-        try:
-            os.remove(file_path)
-            print(f"Deleted video file from disk: {file_path}")
-        except OSError as e:
-            print(f"Error deleting video file {file_path}: {e}")
-            raise HTTPException(status_code=500, detail=f"Failed to delete video file from disk: {e}")
-    else:
-        print(f"Video file not found on disk, but DB entry was deleted: {file_path}")
+    # Delete the video, its preview images and any partial files; failures are logged and left to the storage sweep
+    if video_filename:
+        freed = remove_video_files(video_filename)
+        print(f"Deleted files of {video_filename} from disk ({freed} bytes)")
 
     return {"message": f"Video with ID {video_id} and file '{video_filename}' deleted successfully."}
+
+
+@app.get("/storage/", response_model=schemas.StorageUsage)
+async def storage_usage(db: Session = Depends(get_db)):
+    """
+    Reports disk usage of the video storage directory against its quota.
+    """
+    return get_storage_usage(db)
+
+
+@app.post("/storage/sweep", response_model=schemas.StorageSweepReport)
+async def run_storage_sweep():
+    """
+    Runs a storage lifecycle sweep immediately (reconcile, orphan cleanup, age/quota eviction).
+    """
+    report = await asyncio.to_thread(sweep_storage, SessionLocal)
+    for video_filename in report["evicted"] + report["missing"]:
+        invalidate_video_status(video_filename)
+    return report
@@ -0,0 +1,77 @@
+# benchmark_encoding.py
+# Reports encode time and output size for each encoding profile on a synthetic slideshow.
+# Usage: python benchmark_encoding.py [--slides 5] [--seconds 4] [--profiles fast balanced archive]
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+from moviepy.editor import concatenate_videoclips
+from moviepy.audio.AudioClip import AudioArrayClip
+from PIL import Image
+
+from render_config import ENCODING_PROFILES, VIDEO_SIZES
+from video_creator import (
+    AUDIO_CHANNELS,
+    AUDIO_FPS,
+    SLIDE_PADDING_SECONDS,
+    add_pil_text_overlay,
+    build_voice_track,
+    make_slide_clip,
+    write_encoded_video,
+)
+
+
+def synthetic_slide(index, video_size):
+    """A gradient "product photo" with a caption, standing in for a scraped image."""
+    x = np.linspace(0, 1, video_size[0], dtype=np.float32)[None, :, None]
+    y = np.linspace(0, 1, video_size[1], dtype=np.float32)[:, None, None]
+    tint = np.array([(index * 70) % 255, 120, 255 - (index * 40) % 255], dtype=np.float32)
+    pixels = (tint * (0.4 + 0.3 * x + 0.3 * y)).astype(np.uint8)
+    image = Image.fromarray(pixels)
+    return np.array(add_pil_text_overlay(image, f"Benchmark slide {index + 1}", video_size))
+
+
+def synthetic_speech(seconds):
+    """A quiet tone in place of gTTS output, so the benchmark needs no network."""
+    t = np.arange(int(seconds * AUDIO_FPS), dtype=np.float32) / AUDIO_FPS
+    tone = 0.1 * np.sin(2 * np.pi * 220 * t)
+    return np.repeat(tone[:, None], AUDIO_CHANNELS, axis=1)
+
+
+def run(slides, seconds, profiles):
+    video_size = VIDEO_SIZES["16:9"]
+    frames = [synthetic_slide(i, video_size) for i in range(slides)]
+    speech = [synthetic_speech(seconds - SLIDE_PADDING_SECONDS) for _ in range(slides)]
+    durations = [(len(segment) + int(SLIDE_PADDING_SECONDS * AUDIO_FPS)) / AUDIO_FPS for segment in speech]
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in profiles:
+            clips = [make_slide_clip(frame, duration) for frame, duration in zip(frames, durations)]
+            video = concatenate_videoclips(clips, method="compose")
+            video = video.set_audio(AudioArrayClip(build_voice_track(speech), fps=AUDIO_FPS))
+
+            output = os.path.join(workdir, f"{name}.mp4")
+            started = time.perf_counter()
+            write_encoded_video(video, output, durations, name, temp_audiofile=os.path.join(workdir, f"{name}.m4a"))
+            elapsed = time.perf_counter() - started
+
+            size = os.path.getsize(output)
+            results.append((name, elapsed, size, size * 8 / sum(durations) / 1000))
+
+    print(f"\n{slides} slides x {seconds:.1f}s at {video_size[0]}x{video_size[1]}")
+    print(f"{'profile':<10} {'encode s':>9} {'size KiB':>9} {'kbit/s':>8}")
+    for name, elapsed, size, kbps in results:
+        print(f"{name:<10} {elapsed:>9.1f} {size / 1024:>9.0f} {kbps:>8.0f}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Encode time and output size per encoding profile.")
+    parser.add_argument("--slides", type=int, default=5)
+    parser.add_argument("--seconds", type=float, default=4.0, help="length of each slide")
+    parser.add_argument("--profiles", nargs="+", default=list(ENCODING_PROFILES), choices=list(ENCODING_PROFILES))
+    args = parser.parse_args()
+    run(args.slides, args.seconds, args.profiles)
@@ -0,0 +1,8 @@
+# migrate.py
+# Explicit schema setup step; run before starting the API (`python migrate.py`).
+import models  # noqa: F401  (registers the tables on Base.metadata)
+from database import upgrade_schema
+
+if __name__ == "__main__":
+    upgrade_schema()
+    print("Database schema is up to date.")
@@ -11,9 +11,12 @@ class Video(Base):
     original_url = Column(String, index=True)
     product_title = Column(String, index=True)
     video_filename = Column(String, unique=True, index=True)
-    status = Column(String, default="processing")  # e.g., "processing", "completed", "failed"
+    status = Column(String, default="processing")  # e.g., "processing", "completed", "failed", "evicted"
     created_at = Column(DateTime, server_default=func.now())  # Automatically set timestamp on creation
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())  # Automatically update timestamp
+    last_accessed_at = Column(DateTime, nullable=True)  # Last time the video was served; drives LRU eviction
+    evicted_at = Column(DateTime, nullable=True)  # Set when the storage manager removes the file from disk
+    encoding_profile = Column(String, nullable=True)  # render_config.ENCODING_PROFILES key used for the render
 
     def __repr__(self):
         return f"<Video(title='{self.product_title}', filename='{self.video_filename}', status='{self.status}')>"
@@ -0,0 +1,53 @@
+# render_config.py
+# Render settings shared by the API tier and the render code.
+# Keep this module free of media imports (MoviePy, Pillow, NumPy) so the API can import it cheaply.
+import os
+
+VIDEO_SIZES = {"16:9": (1920, 1080), "9:16": (1080, 1920)}  # Full HD
+
+# --- Encoding profiles ---
+# Slides are still images, so every profile forces keyframes only at slide boundaries (scene-cut detection off)
+# and uses CRF rate control.
+#   fps: output frame rate (fewer frames to compose and encode for "fast")
+#   preset / crf: x264 speed/efficiency trade-off and quality target (lower crf = higher quality, bigger file)
+#   tune: x264 tuning; "stillimage" keeps fine detail but costs ~25% more bits here because of the slow zoom,
+#         so only "archive" uses it
+#   keyint_seconds: longest keyframe interval inside a slide, bounding seek cost
+#   cpu_factor: CPU cost of the preset relative to "medium" at the same fps, used by admission control
+#               (benchmark_encoding.py: "slow" + stillimage takes ~1.4x as long as "balanced")
+ENCODING_PROFILES = {
+    "fast": {
+        "fps": 15,
+        "preset": "veryfast",
+        "crf": 28,
+        "tune": None,
+        "keyint_seconds": 10,
+        "audio_bitrate": "96k",
+        "cpu_factor": 0.7,
+    },
+    "balanced": {
+        "fps": 24,
+        "preset": "medium",
+        "crf": 24,
+        "tune": None,
+        "keyint_seconds": 10,
+        "audio_bitrate": "128k",
+        "cpu_factor": 1.0,
+    },
+    "archive": {
+        "fps": 24,
+        "preset": "slow",
+        "crf": 18,
+        "tune": "stillimage",
+        "keyint_seconds": 5,
+        "audio_bitrate": "192k",
+        "cpu_factor": 1.4,
+    },
+}
+DEFAULT_ENCODING_PROFILE = os.getenv("DEFAULT_ENCODING_PROFILE", "balanced")
+if DEFAULT_ENCODING_PROFILE not in ENCODING_PROFILES:
+    raise ValueError(
+        f"DEFAULT_ENCODING_PROFILE={DEFAULT_ENCODING_PROFILE!r} is not one of: {', '.join(ENCODING_PROFILES)}"
+    )
+# x264 threads per render; the default matches admission control's two cores per render slot
+ENCODER_THREADS = int(os.getenv("ENCODER_THREADS", "2"))
@@ -1,10 +1,20 @@
-from pydantic import BaseModel, HttpUrl  # HttpUrl for strict URL validation
+from pydantic import BaseModel, HttpUrl, field_validator  # HttpUrl for strict URL validation
 from datetime import datetime
 
+from render_config import DEFAULT_ENCODING_PROFILE, ENCODING_PROFILES
+
 
 # Schema for the incoming request to generate a video
 class URLInput(BaseModel):
     url: HttpUrl  # Use HttpUrl for Pydantic's built-in URL validation
+    encoding_profile: str = DEFAULT_ENCODING_PROFILE  # One of render_config.ENCODING_PROFILES
+
+    @field_validator("encoding_profile")
+    @classmethod
+    def check_encoding_profile(cls, value):
+        if value not in ENCODING_PROFILES:
+            raise ValueError(f"Unknown encoding profile; choose one of: {', '.join(ENCODING_PROFILES)}")
+        return value
 
 
 # Base schema for Video attributes
@@ -24,6 +34,8 @@ class Video(VideoBase):
     id: int
     created_at: datetime
     updated_at: datetime
+    encoding_profile: str | None = None
+    queue_position: int | None = None  # 0 = rendering now, N = waiting behind N-1 jobs
 
     class Config:
         from_attributes = True
@@ -39,3 +51,38 @@ class VideoList(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+# Schema for the render admission/queue report
+class RenderQueueStatus(BaseModel):
+    running: int
+    queued: int
+    max_queue: int
+    scraping: int
+    max_scrapes: int
+    memory_reserved_bytes: int
+    memory_queued_bytes: int
+    memory_budget_bytes: int
+    cpu_reserved: float
+    cpu_budget: float
+    retry_after_seconds: int
+
+
+# Schema for the storage usage report
+class StorageUsage(BaseModel):
+    used_bytes: int
+    quota_bytes: int
+    file_count: int
+    disk_total_bytes: int
+    disk_free_bytes: int
+    videos_by_status: dict[str, int]
+
+
+# Schema for the result of a storage lifecycle sweep
+class StorageSweepReport(BaseModel):
+    evicted: list[str]
+    missing: list[str]
+    stale_failed: list[int]
+    leftovers_removed: list[str]
+    orphans_removed: list[str]
+    freed_bytes: int
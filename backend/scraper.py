@@ -1,10 +1,11 @@
 # scraper.py
-import requests
 from bs4 import BeautifulSoup
 from PIL import Image
 from io import BytesIO
 import re
 
+from throttled_http import ThrottledError, throttled_get
+
 
 def to_high_res_amazon_url(url, resolution="SL1500"):
     """
@@ -24,10 +25,14 @@ def scrape_product_data(url):
     headers = {
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/84.0.4147.135 Safari/537.36"  # noqa
     }
-    page = requests.get(url, headers=headers)
+    # Rate limited, retried and circuit-broken per host; raises ThrottledError when the host is blocking us
+    page = throttled_get(url, headers=headers)
     soup = BeautifulSoup(page.content, "html.parser")
 
-    title = soup.find("span", id="productTitle").get_text(strip=True)
+    title_tag = soup.find("span", id="productTitle")
+    if title_tag is None:
+        raise ValueError(f"No product title found on {url}; is this a product page?")
+    title = title_tag.get_text(strip=True)
 
     price = ""
     try:
@@ -52,10 +57,16 @@ def scrape_product_data(url):
         if high_res_url and high_res_url not in downloaded:
             # img_url = img_url.replace("_SS40_", "_SL1500_")
             try:
-                img_data = requests.get(high_res_url, headers=headers).content
+                img_data = throttled_get(high_res_url, headers=headers).content
                 image = Image.open(BytesIO(img_data)).convert("RGB")
                 image_bytes_list.append(image)
                 downloaded.add(high_res_url)
+            except ThrottledError as e:
+                # The image host is throttling us; further downloads would only fail or make it worse
+                if not image_bytes_list:
+                    raise
+                print(f"Image {idx+1} download stopped, keeping {len(image_bytes_list)} images: {e}")
+                break
             except Exception as e:
                 print(f"Image {idx+1} download failed: {e}")
 
@@ -0,0 +1,238 @@
+# storage_manager.py
+import os
+import shutil
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func
+
+import models
+
+# --- Storage configuration ---
+TEMP_VIDEO_DIR = os.getenv("TEMP_VIDEO_DIR", "temp_videos")
+STORAGE_QUOTA_BYTES = int(os.getenv("STORAGE_QUOTA_BYTES", str(5 * 1024**3)))  # 5 GiB
+STORAGE_MAX_AGE_HOURS = float(os.getenv("STORAGE_MAX_AGE_HOURS", "168"))  # 0 disables age-based eviction
+STORAGE_SWEEP_INTERVAL = float(os.getenv("STORAGE_SWEEP_INTERVAL", "300"))
+# Untracked files younger than this are left alone (e.g. a render that has not registered yet)
+ORPHAN_GRACE_SECONDS = float(os.getenv("STORAGE_ORPHAN_GRACE_SECONDS", "3600"))
+# "queued"/"processing" rows older than this are assumed to belong to a crashed render
+STALE_PROCESSING_SECONDS = float(os.getenv("STORAGE_STALE_PROCESSING_SECONDS", "7200"))
+
+PARTIAL_MARKER = ".partial"
+
+_pending_access = {}
+_access_lock = threading.Lock()
+
+
+def _utcnow():
+    # Naive UTC, matching SQLite's CURRENT_TIMESTAMP used for created_at/updated_at
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def preview_paths(output):
+    """Returns the (poster, thumbnail strip) image paths that belong to a video file."""
+    stem = os.path.splitext(output)[0]
+    return f"{stem}_poster.jpg", f"{stem}_thumbs.jpg"
+
+
+def partial_path(path):
+    """
+    Path a file is written to before being renamed into place.
+    Writers rename with os.replace only once the file is complete, so half-written files are never served.
+    """
+    stem, ext = os.path.splitext(path)
+    return f"{stem}{PARTIAL_MARKER}{ext}"
+
+
+def audio_temp_path(output):
+    """Scratch file the encoder muxes the voice track from; only exists while a render is running."""
+    return partial_path(f"{os.path.splitext(output)[0]}_audio.m4a")
+
+
+def owned_paths(video_filename):
+    """All files in TEMP_VIDEO_DIR that may belong to a video, including in-progress partial files."""
+    video_path = os.path.join(TEMP_VIDEO_DIR, video_filename)
+    paths = [video_path, *preview_paths(video_path)]
+    return paths + [partial_path(path) for path in paths] + [audio_temp_path(video_path)]
+
+
+def remove_video_files(video_filename):
+    """Removes a video and its derived files from disk. Returns the number of bytes freed."""
+    freed = 0
+    for path in owned_paths(video_filename):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+            freed += size
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Error removing {path}: {e}")
+    return freed
+
+
+def record_access(video_filename):
+    """Notes that a video was served. Buffered in memory and flushed to the DB by the next sweep."""
+    with _access_lock:
+        _pending_access[video_filename] = _utcnow()
+
+
+def _flush_access_times(db):
+    global _pending_access
+    with _access_lock:
+        pending, _pending_access = _pending_access, {}
+    if not pending:
+        return
+
+    for video in db.query(models.Video).filter(models.Video.video_filename.in_(pending.keys())).all():
+        video.last_accessed_at = pending[video.video_filename]
+    db.commit()
+
+
+def _scan_files():
+    """Maps every regular file in TEMP_VIDEO_DIR to its stat result."""
+    files = {}
+    with os.scandir(TEMP_VIDEO_DIR) as entries:
+        for entry in entries:
+            if entry.is_file(follow_symlinks=False):
+                files[entry.name] = entry.stat(follow_symlinks=False)
+    return files
+
+
+def _last_used(video):
+    return video.last_accessed_at or video.updated_at or video.created_at
+
+
+def get_storage_usage(db):
+    """Reports bytes used by TEMP_VIDEO_DIR against the quota, free space on the volume and rows by status."""
+    files = _scan_files()
+    disk = shutil.disk_usage(TEMP_VIDEO_DIR)
+    videos_by_status = dict(db.query(models.Video.status, func.count(models.Video.id)).group_by(models.Video.status))
+
+    return {
+        "used_bytes": sum(stat_result.st_size for stat_result in files.values()),
+        "quota_bytes": STORAGE_QUOTA_BYTES,
+        "file_count": len(files),
+        "disk_total_bytes": disk.total,
+        "disk_free_bytes": disk.free,
+        "videos_by_status": videos_by_status,
+    }
+
+
+def _remove_owned_files(video, files):
+    """Removes a video's files and drops them from the scanned file map. Returns the number of bytes freed."""
+    freed = remove_video_files(video.video_filename)
+    for path in owned_paths(video.video_filename):
+        files.pop(os.path.basename(path), None)
+    return freed
+
+
+def _evict(db, video, now, files, report):
+    freed = _remove_owned_files(video, files)
+    video.status = "evicted"
+    video.evicted_at = now
+    db.add(video)
+    report["evicted"].append(video.video_filename)
+    report["freed_bytes"] += freed
+    print(f"Evicted {video.video_filename} ({freed} bytes)")
+
+
+def sweep_storage(db_session_factory):
+    """
+    One pass of the storage lifecycle:
+      1. flush buffered access times,
+      2. reconcile rows with disk (completed rows without a file become "evicted",
+         stale "queued"/"processing" rows become "failed", files left behind by "failed"/"evicted" rows are removed),
+      3. delete orphan files no row refers to,
+      4. evict completed videos past STORAGE_MAX_AGE_HOURS, then least recently used ones until under quota.
+    Receives a db_session_factory to create its own session, like the render background task.
+    """
+    report = {
+        "evicted": [],
+        "missing": [],
+        "stale_failed": [],
+        "leftovers_removed": [],
+        "orphans_removed": [],
+        "freed_bytes": 0,
+    }
+    db = db_session_factory()
+    try:
+        _flush_access_times(db)
+
+        now = _utcnow()
+        # Rows before files: a render that finishes in between then shows up as a "processing" row whose
+        # file exists, rather than a "completed" row whose file seems to be missing.
+        videos = db.query(models.Video).all()
+        files = _scan_files()
+
+        owned = set()
+        for video in videos:
+            if video.video_filename:
+                owned.update(os.path.basename(path) for path in owned_paths(video.video_filename))
+
+        for video in videos:
+            if (
+                video.status == "completed"
+                and video.video_filename not in files
+                and not os.path.exists(os.path.join(TEMP_VIDEO_DIR, video.video_filename))
+            ):
+                video.status = "evicted"
+                video.evicted_at = now
+                db.add(video)
+                report["freed_bytes"] += _remove_owned_files(video, files)
+                report["missing"].append(video.video_filename)
+                print(f"Video file missing on disk, marked evicted: {video.video_filename}")
+            elif video.status in ("queued", "processing") and video.created_at < now - timedelta(
+                seconds=STALE_PROCESSING_SECONDS
+            ):
+                print(f"Stale {video.status} video marked failed: ID {video.id}")
+                video.status = "failed"
+                db.add(video)
+                if video.video_filename:
+                    report["freed_bytes"] += _remove_owned_files(video, files)
+                report["stale_failed"].append(video.id)
+            elif (
+                video.status in ("failed", "evicted")
+                and video.video_filename
+                and any(os.path.basename(path) in files for path in owned_paths(video.video_filename))
+            ):
+                # Whatever path left them (a crashed render, a missing video), nothing will serve these files again
+                freed = _remove_owned_files(video, files)
+                report["freed_bytes"] += freed
+                report["leftovers_removed"].append(video.video_filename)
+                print(f"Removed leftover files of {video.status} video {video.video_filename} ({freed} bytes)")
+        db.commit()
+
+        now_ts = time.time()
+        for name, stat_result in list(files.items()):
+            if name in owned or now_ts - stat_result.st_mtime < ORPHAN_GRACE_SECONDS:
+                continue
+            try:
+                os.remove(os.path.join(TEMP_VIDEO_DIR, name))
+            except OSError as e:
+                print(f"Error removing orphan file {name}: {e}")
+                continue
+            del files[name]
+            report["orphans_removed"].append(name)
+            report["freed_bytes"] += stat_result.st_size
+            print(f"Removed orphan file: {name}")
+
+        evictable = sorted(
+            (video for video in videos if video.status == "completed" and video.video_filename in files),
+            key=_last_used,
+        )
+        if STORAGE_MAX_AGE_HOURS > 0:
+            cutoff = now - timedelta(hours=STORAGE_MAX_AGE_HOURS)
+            while evictable and _last_used(evictable[0]) < cutoff:
+                _evict(db, evictable.pop(0), now, files, report)
+
+        used_bytes = sum(stat_result.st_size for stat_result in files.values())
+        while evictable and used_bytes > STORAGE_QUOTA_BYTES:
+            _evict(db, evictable.pop(0), now, files, report)
+            used_bytes = sum(stat_result.st_size for stat_result in files.values())
+
+        db.commit()
+        return report
+    finally:
+        db.close()
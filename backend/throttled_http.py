@@ -0,0 +1,202 @@
+# throttled_http.py
+import math
+import os
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+# requests is imported where it is used, so the API process can import the error types and settings cheaply.
+
+# --- Per-host throttling configuration ---
+SCRAPER_RATE_PER_HOST = float(os.getenv("SCRAPER_RATE_PER_HOST", "1.0"))  # sustained requests/second per host
+SCRAPER_BURST = float(os.getenv("SCRAPER_BURST", "5"))  # requests a host may receive back to back
+# Per-host overrides, e.g. "m.media-amazon.com=10,www.amazon.in=0.5"
+SCRAPER_HOST_RATES = {
+    host.strip(): float(rate)
+    for host, rate in (item.split("=", 1) for item in os.getenv("SCRAPER_HOST_RATES", "").split(",") if "=" in item)
+}
+SCRAPER_TIMEOUT = float(os.getenv("SCRAPER_TIMEOUT", "15"))
+SCRAPER_MAX_RETRIES = int(os.getenv("SCRAPER_MAX_RETRIES", "3"))
+SCRAPER_BACKOFF_BASE = float(os.getenv("SCRAPER_BACKOFF_BASE", "1.0"))
+SCRAPER_BACKOFF_CAP = float(os.getenv("SCRAPER_BACKOFF_CAP", "30"))
+# Consecutive failures that open a host's circuit, and how long it stays open
+SCRAPER_BREAKER_THRESHOLD = int(os.getenv("SCRAPER_BREAKER_THRESHOLD", "5"))
+SCRAPER_BREAKER_COOLDOWN = float(os.getenv("SCRAPER_BREAKER_COOLDOWN", "60"))
+# Threads for scraping; more scrapes than a host's burst (or rate) at once would mostly sleep in its token bucket
+SCRAPER_WORKERS = int(os.getenv("SCRAPER_WORKERS", str(max(2, math.ceil(max(SCRAPER_BURST, SCRAPER_RATE_PER_HOST))))))
+
+TRANSIENT_STATUS_CODES = {429, 500, 502, 503, 504}
+# Markers of Amazon's robot-check / captcha interstitial
+BLOCK_PAGE_MARKERS = (
+    b"/errors/validateCaptcha",
+    b"Type the characters you see in this image",
+    b"api-services-support@amazon.com",
+    b"<title>Robot Check</title>",
+)
+
+
+class ThrottledError(Exception):
+    """A host is throttling or blocking us. retry_after is a hint in seconds."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class HostBlockedError(ThrottledError):
+    """Retries were exhausted while the host kept answering with 429/503 or block pages."""
+
+
+class CircuitOpenError(ThrottledError):
+    """The host's circuit is open; the request was not sent."""
+
+
+class TokenBucket:
+    """Thread-safe token bucket; acquire() blocks until a token is available."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = max(1.0, burst)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    """
+    Opens after SCRAPER_BREAKER_THRESHOLD consecutive failures and rejects calls for the cooldown.
+    After the cooldown a single trial request is let through; success closes the circuit, failure reopens it.
+    """
+
+    def __init__(self, threshold, cooldown):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+
+    def before_request(self, host):
+        with self.lock:
+            if self.opened_at is None:
+                return
+            remaining = self.opened_at + self.cooldown - time.monotonic()
+            if remaining > 0 or self.trial_in_flight:
+                raise CircuitOpenError(
+                    f"{host} is throttling requests; not retrying until it recovers.", max(1, round(remaining))
+                )
+            self.trial_in_flight = True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def abandon_trial(self):
+        with self.lock:
+            self.trial_in_flight = False
+
+    def record_failure(self, host):
+        with self.lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+                print(f"⛔ Circuit opened for {host} after {self.failures} consecutive failures")
+
+
+_buckets = {}
+_breakers = {}
+_registry_lock = threading.Lock()
+_local = threading.local()
+
+
+def _host_state(host):
+    with _registry_lock:
+        if host not in _buckets:
+            _buckets[host] = TokenBucket(SCRAPER_HOST_RATES.get(host, SCRAPER_RATE_PER_HOST), SCRAPER_BURST)
+            _breakers[host] = CircuitBreaker(SCRAPER_BREAKER_THRESHOLD, SCRAPER_BREAKER_COOLDOWN)
+        return _buckets[host], _breakers[host]
+
+
+def _session():
+    # One keep-alive session per thread; requests.Session is not guaranteed to be thread-safe
+    import requests
+
+    if not hasattr(_local, "session"):
+        _local.session = requests.Session()
+    return _local.session
+
+
+def is_block_page(response):
+    """Detects captcha / robot-check interstitials, which Amazon may serve with a 200 status."""
+    if "html" not in response.headers.get("Content-Type", ""):
+        return False
+    return any(marker in response.content for marker in BLOCK_PAGE_MARKERS)
+
+
+def _retry_after_header(response):
+    try:
+        return float(response.headers.get("Retry-After", ""))
+    except ValueError:
+        return None
+
+
+def throttled_get(url, headers=None):
+    """
+    GET through the host's token bucket and circuit breaker.
+    Connection errors, timeouts, 429/5xx responses and block pages are retried with full-jitter
+    exponential backoff (honouring Retry-After). Other HTTP errors are raised immediately.
+    """
+    import requests
+
+    host = urlparse(url).netloc
+    bucket, breaker = _host_state(host)
+
+    for attempt in range(SCRAPER_MAX_RETRIES + 1):
+        breaker.before_request(host)
+        bucket.acquire()
+
+        retry_after = None
+        try:
+            response = _session().get(url, headers=headers, timeout=SCRAPER_TIMEOUT)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            failure = f"{type(e).__name__}: {e}"
+        except Exception:
+            # Not a sign of throttling (e.g. an invalid URL); don't count it, but free a half-open trial slot
+            breaker.abandon_trial()
+            raise
+        else:
+            if response.status_code in TRANSIENT_STATUS_CODES:
+                failure = f"HTTP {response.status_code}"
+                retry_after = _retry_after_header(response)
+            elif is_block_page(response):
+                failure = "block page (captcha / robot check)"
+            else:
+                breaker.record_success()
+                response.raise_for_status()
+                return response
+
+        breaker.record_failure(host)
+        if attempt == SCRAPER_MAX_RETRIES:
+            break
+        backoff = random.uniform(0, min(SCRAPER_BACKOFF_CAP, SCRAPER_BACKOFF_BASE * 2**attempt))
+        delay = min(SCRAPER_BACKOFF_CAP, retry_after) if retry_after else backoff
+        print(f"🔁 {host}: {failure}; retry {attempt + 1}/{SCRAPER_MAX_RETRIES} in {delay:.1f}s")
+        time.sleep(delay)
+
+    raise HostBlockedError(f"{host} is throttling or blocking requests ({failure}).", round(SCRAPER_BREAKER_COOLDOWN))
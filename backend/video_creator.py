@@ -1,11 +1,30 @@
-from moviepy.editor import AudioFileClip, ImageClip, concatenate_videoclips
+from moviepy.editor import ImageClip, concatenate_videoclips
+from moviepy.audio.AudioClip import AudioArrayClip
+from moviepy.audio.io.ffmpeg_audiowriter import FFMPEG_AudioWriter
+from moviepy.config import get_setting
 from PIL import ImageDraw, ImageFont, Image
 import numpy as np
 import re
-import tempfile
+import subprocess
 import os
+from io import BytesIO
 from gtts import gTTS
 
+from render_config import DEFAULT_ENCODING_PROFILE, ENCODER_THREADS, ENCODING_PROFILES, VIDEO_SIZES
+from storage_manager import audio_temp_path, partial_path, preview_paths
+
+# Voice track: speech is kept as float32 PCM (samples x channels) and mixed once for the whole video.
+AUDIO_FPS = 44100
+AUDIO_CHANNELS = 2
+AUDIO_NBYTES = 4  # sample width handed to the AAC encoder, MoviePy's default for write_videofile
+AUDIO_BUFFER_SIZE = 2000
+VOICE_FADE_SECONDS = 0.2
+SLIDE_PADDING_SECONDS = 0.5  # silence after each slide's speech
+
+# Preview images written next to each rendered video so listings don't need to load the MP4.
+POSTER_WIDTH = 640
+THUMBNAIL_HEIGHT = 90
+
 
 def remove_emojis(text):
     text = text.replace("*", "")
@@ -55,21 +74,155 @@ def add_pil_text_overlay(img, text, video_size, fontsize=60):
     return img
 
 
-def generate_voice(text, filename):
+def decode_audio(data):
+    """Decodes compressed audio bytes to float32 PCM through ffmpeg pipes, without temp files."""
+    command = [get_setting("FFMPEG_BINARY"), "-loglevel", "error", "-i", "pipe:0"]
+    command += ["-f", "s16le", "-acodec", "pcm_s16le", "-ar", str(AUDIO_FPS), "-ac", str(AUDIO_CHANNELS), "pipe:1"]
+    result = subprocess.run(command, input=data, capture_output=True, check=True)
+    pcm = np.frombuffer(result.stdout, dtype=np.int16).reshape(-1, AUDIO_CHANNELS)
+    return pcm.astype(np.float32) / 32768
+
+
+def synthesize_voice(text):
+    """Synthesizes speech with gTTS into memory and returns it as PCM."""
     text = text.strip()
     if not text:
-        return
+        raise ValueError("No text to synthesize.")
+    mp3 = BytesIO()
     try:
-        tts = gTTS(text)
-        tts.save(filename)
+        gTTS(text).write_to_fp(mp3)
     except Exception as e:
         print("Voice generation failed:", e)
+        raise
+    return decode_audio(mp3.getvalue())
+
+
+def build_voice_track(segments):
+    """
+    Lays out every slide's speech back to back, each followed by SLIDE_PADDING_SECONDS of silence,
+    and applies the fade-in/fade-out with a single gain envelope over the whole track.
+    """
+    padding = int(SLIDE_PADDING_SECONDS * AUDIO_FPS)
+    total = sum(len(segment) + padding for segment in segments)
+    track = np.zeros((total, AUDIO_CHANNELS), dtype=np.float32)
+    envelope = np.zeros(total, dtype=np.float32)
+
+    offset = 0
+    for segment in segments:
+        length = len(segment)
+        fade = min(int(VOICE_FADE_SECONDS * AUDIO_FPS), length // 2)
+        track[offset : offset + length] = segment
+        gain = envelope[offset : offset + length]
+        gain[:] = 1.0
+        if fade:
+            ramp = np.linspace(0.0, 1.0, fade, endpoint=False, dtype=np.float32)
+            gain[:fade] = ramp
+            gain[length - fade :] = ramp[::-1]
+        offset += length + padding
+
+    track *= envelope[:, None]
+    return track
+
+
+def save_preview_images(frames, output):
+    """Writes a poster (first slide) and a horizontal thumbnail strip (one tile per slide)."""
+    poster_path, thumbs_path = preview_paths(output)
+    partial_poster_path, partial_thumbs_path = partial_path(poster_path), partial_path(thumbs_path)
+
+    poster = Image.fromarray(frames[0])
+    poster.thumbnail((POSTER_WIDTH, POSTER_WIDTH), Image.LANCZOS)
+    poster.save(partial_poster_path, "JPEG", quality=80, optimize=True, progressive=True)
+
+    tiles = []
+    for frame in frames:
+        tile = Image.fromarray(frame)
+        tile_width = max(1, round(tile.width * THUMBNAIL_HEIGHT / tile.height))
+        tiles.append(tile.resize((tile_width, THUMBNAIL_HEIGHT), Image.LANCZOS))
+
+    strip = Image.new("RGB", (sum(tile.width for tile in tiles), THUMBNAIL_HEIGHT))
+    x = 0
+    for tile in tiles:
+        strip.paste(tile, (x, 0))
+        x += tile.width
+    strip.save(partial_thumbs_path, "JPEG", quality=75, optimize=True)
+
+    os.replace(partial_poster_path, poster_path)
+    os.replace(partial_thumbs_path, thumbs_path)
+    return poster_path, thumbs_path
+
+
+def make_slide_clip(frame, duration):
+    return (
+        ImageClip(frame)
+        .set_duration(duration)
+        .resize(lambda t: 1.0 + 0.004 * t)  # very light zoom
+        .fadein(0.5)
+        .fadeout(0.5)
+    )
 
 
-def create_ad_video(image_list, bullets, title, price, output="product_video.mp4", aspect_ratio="16:9"):
-    video_size = (1920, 1080) if aspect_ratio == "16:9" else (1080, 1920)  # Full HD
+def write_encoded_video(video, output, slide_durations, profile_name=DEFAULT_ENCODING_PROFILE, temp_audiofile=None):
+    """
+    Encodes with an ENCODING_PROFILES entry: CRF/preset, optional x264 tuning and an explicit thread count.
+    Keyframes are forced at every slide start and scene-cut detection is off, so each slide's frames
+    are cheap P-frames off one keyframe instead of the encoder inserting keyframes during fades.
+    The audio track is encoded to temp_audiofile when one is given; removing it is up to the caller.
+    """
+    profile = ENCODING_PROFILES[profile_name]
+    slide_starts = np.cumsum([0.0, *slide_durations[:-1]])
+    ffmpeg_params = ["-crf", str(profile["crf"])]
+    if profile["tune"]:
+        ffmpeg_params += ["-tune", profile["tune"]]
+    ffmpeg_params += ["-force_key_frames", ",".join(f"{start:.3f}" for start in slide_starts)]
+    ffmpeg_params += ["-g", str(profile["fps"] * profile["keyint_seconds"]), "-sc_threshold", "0"]
+    # "+faststart" moves the moov atom to the front so browsers can start playback without fetching the tail
+    ffmpeg_params += ["-movflags", "+faststart"]
+
+    audio = True
+    if temp_audiofile and video.audio is not None:
+        # Encode the track ourselves: when a chunk fails, MoviePy leaves its audio ffmpeg process running, and that
+        # process writes temp_audiofile only once it is garbage collected, after the caller has cleaned up
+        with FFMPEG_AudioWriter(
+            temp_audiofile,
+            AUDIO_FPS,
+            AUDIO_NBYTES,
+            video.audio.nchannels,
+            codec="aac",
+            bitrate=profile["audio_bitrate"],
+        ) as writer:
+            for chunk in video.audio.iter_chunks(
+                chunksize=AUDIO_BUFFER_SIZE, quantize=True, nbytes=AUDIO_NBYTES, fps=AUDIO_FPS
+            ):
+                writer.write_frames(chunk)
+        audio = temp_audiofile
+
+    video.write_videofile(
+        output,
+        fps=profile["fps"],
+        codec="libx264",
+        preset=profile["preset"],
+        threads=ENCODER_THREADS,
+        audio_codec="aac",
+        audio_fps=AUDIO_FPS,
+        audio_bitrate=profile["audio_bitrate"],
+        audio=audio,
+        ffmpeg_params=ffmpeg_params,
+    )
+
+
+def create_ad_video(
+    image_list,
+    bullets,
+    title,
+    price,
+    output="product_video.mp4",
+    aspect_ratio="16:9",
+    encoding_profile=DEFAULT_ENCODING_PROFILE,
+):
+    video_size = VIDEO_SIZES["16:9"] if aspect_ratio == "16:9" else VIDEO_SIZES["9:16"]
     clips = []
-    audio_segments = []
+    voice_segments = []
+    frames = []
 
     for i, img in enumerate(image_list[: len(bullets) + 1]):
         try:
@@ -77,25 +230,16 @@ def create_ad_video(image_list, bullets, title, price, output="product_video.mp4
             img = img.resize(video_size, Image.LANCZOS)
             text = f"{title}. {price}" if i == 0 else bullets[i - 1]
 
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as tmp_audio:
-                generate_voice(text, tmp_audio.name)
-                audio = AudioFileClip(tmp_audio.name).audio_fadein(0.2).audio_fadeout(0.2)
-                duration = audio.duration + 0.5
+            speech = synthesize_voice(text)
+            # Slide length in whole samples so the video timeline matches the voice track exactly
+            duration = (len(speech) + int(SLIDE_PADDING_SECONDS * AUDIO_FPS)) / AUDIO_FPS
 
-                img_with_text = add_pil_text_overlay(img, text, video_size)
-                frame = np.array(img_with_text)
+            img_with_text = add_pil_text_overlay(img, text, video_size)
+            frame = np.array(img_with_text)
 
-                clip = (
-                    ImageClip(frame)
-                    .set_duration(duration)
-                    .resize(lambda t: 1.0 + 0.004 * t)  # very light zoom
-                    .fadein(0.5)
-                    .fadeout(0.5)
-                    .set_audio(audio)
-                )
-
-                clips.append(clip)
-                audio_segments.append(tmp_audio.name)
+            clips.append(make_slide_clip(frame, duration))
+            voice_segments.append(speech)
+            frames.append(frame)
 
         except Exception as e:
             print(f"Image {i+1} failed: {e}")
@@ -103,14 +247,32 @@ def create_ad_video(image_list, bullets, title, price, output="product_video.mp4
     if not clips:
         raise ValueError("No clips to render.")
 
-    final_video = concatenate_videoclips(clips, method="compose")
-    final_video.write_videofile(output, fps=24, audio_codec="aac")
+    # Encode to a partial file and rename it into place once complete, so a half-encoded video is never served.
+    # The intermediate audio track also goes next to it and is removed whether or not the encode succeeds.
+    partial_output = partial_path(output)
+    try:
+        final_video = concatenate_videoclips(clips, method="compose")
+        # The whole voice track is mixed in memory and handed to the encoder once
+        final_video = final_video.set_audio(AudioArrayClip(build_voice_track(voice_segments), fps=AUDIO_FPS))
+        write_encoded_video(
+            final_video,
+            partial_output,
+            [clip.duration for clip in clips],
+            encoding_profile,
+            temp_audiofile=audio_temp_path(output),
+        )
 
-    for path in audio_segments:
         try:
-            os.remove(path)
-        except Exception:
-            pass
+            save_preview_images(frames, output)
+        except Exception as e:
+            print(f"Preview image generation failed: {e}")
+
+        os.replace(partial_output, output)
+    finally:
+        # MoviePy only deletes its audio file after a successful encode
+        for path in (partial_output, audio_temp_path(output)):
+            if os.path.exists(path):
+                os.remove(path)
 
 
 # from moviepy.editor import AudioFileClip, ImageClip, concatenate_videoclips
@@ -6,6 +6,8 @@ const backendUrl = process.env.REACT_APP_BACKEND_URL || "http://localhost:8000";
 
 function App() {
   const [productUrl, setProductUrl] = useState('');
+  const [encodingProfile, setEncodingProfile] = useState('');
+  const [encodingProfiles, setEncodingProfiles] = useState({});
   const [currentVideoId, setCurrentVideoId] = useState(null);
   const [currentVideoFilename, setCurrentVideoFilename] = useState(null);
   const [isLoading, setIsLoading] = useState(false);
@@ -13,6 +15,10 @@ function App() {
   const [statusMessage, setStatusMessage] = useState('');
   const [videoList, setVideoList] = useState([]);
 
+  useEffect(() => {
+    fetchEncodingProfiles();
+  }, []);
+
   useEffect(() => {
     fetchVideoList();
     const interval = setInterval(fetchVideoList, 5000);
@@ -32,6 +38,20 @@ function App() {
     }
   };
 
+  const fetchEncodingProfiles = async () => {
+    try {
+      const response = await fetch(`${backendUrl}/encoding-profiles/`);
+      if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+      }
+      const data = await response.json();
+      setEncodingProfiles(data.profiles);
+      setEncodingProfile(data.default);
+    } catch (err) {
+      console.error('Error fetching encoding profiles:', err);
+    }
+  };
+
   const handleSubmit = async (e) => {
     e.preventDefault();
     setIsLoading(true);
@@ -41,12 +61,17 @@ function App() {
     setStatusMessage('Starting video generation...');
 
     try {
+      const payload = { url: productUrl };
+      if (encodingProfile) {
+        // Until the profile list has loaded, the server applies its default profile
+        payload.encoding_profile = encodingProfile;
+      }
       const response = await fetch(`${backendUrl}/generate-ad-video/`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
         },
-        body: JSON.stringify({ url: productUrl }),
+        body: JSON.stringify(payload),
       });
 
       const data = await response.json();
@@ -54,11 +79,18 @@ function App() {
       if (response.ok) {
         setCurrentVideoId(data.id);
         setCurrentVideoFilename(data.video_filename);
-        setStatusMessage('Video generation initiated. Please wait a moment for the video to be ready. It will appear in the list below.');
+        setStatusMessage(
+          data.queue_position > 0
+            ? `Video generation queued (position ${data.queue_position}). It will appear in the list below.`
+            : 'Video generation initiated. Please wait a moment for the video to be ready. It will appear in the list below.'
+        );
         setProductUrl('');
         fetchVideoList();
       } else {
-        if (response.status === 422 && data.detail && Array.isArray(data.detail)) {
+        if (response.status === 429 || response.status === 503) {
+          const retryAfter = response.headers.get('Retry-After');
+          setError(`${data.detail}${retryAfter ? ` (try again in about ${retryAfter}s)` : ''}`);
+        } else if (response.status === 422 && data.detail && Array.isArray(data.detail)) {
           const validationErrors = data.detail.map(err => `${err.loc.join('.')} - ${err.msg}`).join('; ');
           setError(`Validation Error: ${validationErrors}`);
         } else {
@@ -138,6 +170,23 @@ function App() {
             required
           />
         </div>
+        <div className="form-group">
+          <label htmlFor="profile-select" className="label">
+            Encoding Profile:
+          </label>
+          <select
+            id="profile-select"
+            className="input-field"
+            value={encodingProfile}
+            onChange={(e) => setEncodingProfile(e.target.value)}
+          >
+            {Object.entries(encodingProfiles).map(([name, profile]) => (
+              <option key={name} value={name}>
+                {`${name} (${profile.fps} fps, ${profile.preset}, CRF ${profile.crf})`}
+              </option>
+            ))}
+          </select>
+        </div>
         <button
           type="submit"
           className="submit-button"
@@ -170,6 +219,8 @@ function App() {
           <video
             controls
             src={`${backendUrl}/get-video/${currentVideoFilename}`}
+            poster={`${backendUrl}/get-poster/${currentVideoFilename}`}
+            preload="metadata"
             className="video-player"
             key={currentVideoFilename}
           >
@@ -194,6 +245,14 @@ function App() {
           <ul className="video-list">
             {videoList.map((video) => (
               <li key={video.id} className="video-list-item">
+                {video.status === 'completed' && video.video_filename && (
+                  <img
+                    src={`${backendUrl}/get-thumbnails/${video.video_filename}`}
+                    alt={`Slides from ${video.product_title}`}
+                    className="video-thumbnails"
+                    loading="lazy"
+                  />
+                )}
                 <div className="video-info">
                   <h3>{video.product_title}</h3>
                   <p>Status: <span className={`status-${video.status}`}>{video.status}</span></p>
@@ -215,9 +274,11 @@ function App() {
                         Delete
                       </button>
                     </>
-                  ) : video.status === 'failed' ? (
+                  ) : video.status === 'failed' || video.status === 'evicted' ? (
                     <>
-                      <span className="no-actions-message">Generation Failed</span>
+                      <span className="no-actions-message">
+                        {video.status === 'failed' ? 'Generation Failed' : 'Expired (removed from storage)'}
+                      </span>
                       <button
                         onClick={() => handleDelete(video.id, video.product_title)}
                         className="delete-button"
@@ -226,7 +287,9 @@ function App() {
                       </button>
                     </>
                   ) : (
-                    <span className="no-actions-message">Processing...</span>
+                    <span className="no-actions-message">
+                      {video.status === 'queued' ? 'Queued...' : 'Processing...'}
+                    </span>
                   )}
                 </div>
               </li>